@@ -1,56 +1,243 @@
+import os
 import sqlite3
 from sqlite3.dbapi2 import DataError
 import threading
-
-import random
-import string
+import queue
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
 from .datatypes import *
 from .errors import *
 
 # TODO: in-code documentation
 
-def _serial():
-    serial = ""
-    while len(serial) != 8:
-        serial += random.choice(string.hexdigits)
-    return serial
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+def _sharedExecutor():
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count() or 4,
+                    thread_name_prefix="sqlitewrapper")
+    return _shared_executor
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _is_number(value):
+    if not isinstance(value, (int, float)):
+        raise TypeError("comparison number must be an integer or float")
+
+def _is_string(value):
+    if not isinstance(value, (str, blob)):
+        raise TypeError("comparison item must be a string")
+
+_OP_VALIDATORS = {
+    ">": _is_number,
+    "<": _is_number,
+    ">=": _is_number,
+    "<=": _is_number,
+    "LIKE": _is_string,
+    "NOT LIKE": _is_string,
+}
+
+_SCALAR_TYPES = frozenset({str, blob, int, float})
+_PRIMARY_OR_SCALAR = _SCALAR_TYPES | {primary}
+
+_SQL_TYPE = {str: "TEXT", int: "INTEGER", float: "REAL", blob: "BLOB"}
+
+_NOT_NULL = " NOT NULL"
+_PRIMARY_KEY = " PRIMARY KEY"
+_PK_AUTOINC = " NOT NULL PRIMARY KEY AUTOINCREMENT"
+_UNIQUE = " NOT NULL UNIQUE"
+_DEFAULT = " DEFAULT "
+_REFERENCES = " NOT NULL REFERENCES "
+
+def _default_literal(value):
+    if value.type in (str, blob):
+        return "'" + value.value + "'"
+    return str(value.value)
+
+_CONSTRAINT_SQL = {
+    foreign: lambda value: _REFERENCES + value.table.name + "(" + value.column + ")",
+    default: lambda value: _DEFAULT + _default_literal(value),
+    unique: lambda value: _UNIQUE,
+    notnull: lambda value: _NOT_NULL,
+}
+
+_SET_EMITTERS = {
+    str: lambda item, value: (f"{item}=?", value),
+    int: lambda item, value: (f"{item}=?", value),
+    float: lambda item, value: (f"{item}=?", value),
+    blob: lambda item, value: (f"{item}=?", value.value),
+    increment: lambda item, value: (f"{item}={item}+?", value.increment),
+    concatenate: lambda item, value: (f"{item}={item} || ?", value.concatenate),
+}
+
+def _format_column(name, value):
+    # foreign keys carry the referenced column's type name, which is
+    # already SQL and not in the lookup table
+    sql_type = _SQL_TYPE.get(value.type, "")
+    if isinstance(value, primary):
+        if value.autoincrement:
+            return f"{name} {sql_type}" + _PK_AUTOINC
+        return f"{name} {sql_type}" + _NOT_NULL
+    constraint = _CONSTRAINT_SQL.get(type(value))
+    if constraint is not None:
+        return f"{name} {sql_type}{constraint(value)}"
+    return f"{name} {sql_type}" 
+
+# SQL templates shared between query objects of the same shape, keyed by
+# (kind, table name, column names)
+_QUERY_TEMPLATE_CACHE = dict()
+
+@lru_cache(maxsize=None)
+def _placeholders(n):
+    """ Returns a cached "?, ?, ..." string with n placeholders. """
+    return ", ".join("?" * n)
+
+# write kinds that can change the schema and must flush the caches
+_DDL_TYPES = frozenset({"create table", "add column", "raw write"})
+
+_DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+    "cache_size": -64000,
+}
+
+def _validate_primary(value, item, database):
+    if value.autoincrement and value.type is not int:
+        raise TypeError("primary keys with autoincrementation must be integers")
+    elif value.type not in _SCALAR_TYPES:
+        raise TypeError(f"'{value.type}' is an invalid data type")
+    return value
+
+def _validate_foreign(value, item, database):
+    if type(value.table) is str:
+        if value.table not in database.tables:
+            raise InstanceError(f"table '{value.table}' does not exist")
+        value.table = database.table(value.table)
+    elif not isinstance(value.table, TableObject):
+        raise InstanceError("table for foreign key is not a table name or a TableObject")
+    elif value.type not in _SCALAR_TYPES:
+        raise TypeError(f"'{value.type}' is an invalid data type")
+    if value.column is None:
+        value.column = item
+    elif type(value.column) is not str:
+        raise TypeError("column for foreign key is not a string or None")
+    schema = value.table._schema()
+    if value.column not in schema:
+        raise InstanceError(f"column '{value.column}' does not exist")
+    value.type = schema[value.column]
+    return value
+
+def _validate_constraint(value, item, database):
+    if value.type not in _SCALAR_TYPES:
+        raise TypeError(f"'{value.type}' is an invalid data type")
+    return value
+
+_COLUMN_VALIDATORS = {
+    primary: _validate_primary,
+    foreign: _validate_foreign,
+    unique: _validate_constraint,
+    default: _validate_constraint,
+    null: _validate_constraint,
+    notnull: _validate_constraint,
+}
 
 class ExecuctionObject:
 
-    _toRead = list()
-    _toWrite = list()
-    _awaited = list()
-    _results = dict()
-
     def __init__(self):
         super(ExecuctionObject, self).__init__()
-        if not isinstance(self, DatabaseObject):
-            raise InstanceError("instance is not a DatabaseObject")
+        self._queue = queue.Queue()
+        self._shutdown = threading.Event()
+        self._in_transaction = False
 
     def waitForQueue(self):
         """ Waits until the queue is empty. """
-        while self.alive:
-            if not self._toRead and not self._toWrite:
-                return
-        raise DatabaseError("cannot wait for queue in closed database")
+        if not self.alive:
+            raise DatabaseError("cannot wait for queue in closed database")
+        self._queue.join()
+
+    def _metaQuery(self, query, inputs=()):
+        """ Runs a metadata query directly, without crossing the queue. """
+        self.waitForQueue()
+        return self._meta_connection.execute(query, inputs).fetchall()
 
     def _read(self, object):
-        object.serial = _serial()
+        object._done = threading.Event()
+        object._error = None
+        object._result = None
         if self.separate_thread:
-            self._toRead.append(object)
-            self._awaitCompletion(object, False)
+            # reads run concurrently on the reader pool once the queued
+            # writes have been executed and committed
+            self._queue.join()
+            self._readers.submit(self._executeRead, object)
         else:
             self._execute(object)
+            object._done.set()
         return self._getResults(object)
 
+    def _executeRead(self, object):
+        try:
+            self._execute(object, connection=self._readerConnection())
+        except Exception as error:
+            object._error = error
+        object._done.set()
+
+    def _readerConnection(self):
+        connection = getattr(self._reader_local, "connection", None)
+        if connection is None:
+            connection = self._connect(readonly=True)
+            self._reader_local.connection = connection
+            self._reader_connections.append(connection)
+        return connection
+
     def _write(self, object):
-        object.serial = _serial()
+        if object.type in _DDL_TYPES:
+            self._invalidateSchema()
+        object._done = threading.Event()
+        object._error = None
         if self.separate_thread:
-            self._toWrite.append(object)
+            self._queue.put(object)
+            if self.shared_executor:
+                self._readers.submit(self._drainOne)
             self._awaitCompletion(object, False)
         else:
             self._execute(object)
+            object._done.set()
+
+    def _drainOne(self):
+        # shared-executor tasks each drain the head of the FIFO queue
+        # under the worker lock, so query order is preserved
+        with self._worker_lock:
+            try:
+                object = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._execute(object, commit=False)
+                if object._is_write:
+                    self._pending_writes += 1
+            except Exception as error:
+                object._error = error
+                if not self._pending_writes and not self._in_transaction \
+                        and self.connection.in_transaction:
+                    self.connection.rollback()
+            if self._pending_writes and (self._pending_writes >= 64 or self._queue.empty()) \
+                    and not self._in_transaction:
+                self.connection.commit()
+                self._pending_writes = 0
+            object._done.set()
+            self._queue.task_done()
 
     def _awaitCompletion(self, object, preference):
         await_completion = preference
@@ -60,89 +247,69 @@ class ExecuctionObject:
             await_completion = self.await_completion
         if not await_completion:
             return
-        while self.alive:
-            if object.serial in self._awaited:
-                index = self._awaited.index(object.serial)
-                self._awaited.pop(index)
-                return
-        raise DatabaseError("cannot await completion from closed database")
+        object._done.wait()
+        if object._error is not None:
+            raise object._error
 
     def _getResults(self, object):
-        while self.alive:
-            if object.serial in self._results:
-                result = self._results[object.serial]
-                del self._results[object.serial]
-                return result
-        raise DatabaseError("cannot retrieve data from closed database")
-
-    def _simplify(self, object, result):
-        if len(object.items) != 1:
-            return False
-        if object.items[0] == "*":
-            return False
-        if result is None:
-            return False
-        return True
-
-    def _execute(self, object):
-        if not isinstance(object, QueryObjects):
-            raise InstanceError("instance is not a valid QueryObject")
-
-        failed = True
-        cursor = self.connection.cursor()
-        try:
-            cursor.execute(object.query, tuple(object.inputs))
-            failed = False
-        except sqlite3.OperationalError as exception:
-            error_message = exception.args[0]
-        except sqlite3.IntegrityError as exception:
-            error_message = exception.args[0]
-
-        if failed:
-            inputs = list()
-            for input in object.inputs:
-                if not isinstance(input, (str, blob)):
-                    inputs.append(str(input))
-                    continue
-                inputs.append("'" + str(input) + "'")
-            raise QueryError(error_message, object.query, inputs)
-
-        if isinstance(object, RawReadObject):
-            result = cursor.fetchall()
-            self._results[object.serial] = result
-
-        if isinstance(object, GetObject):
-            if object.get_type == "first":
-                result = cursor.fetchone()
-                if self._simplify(object, result):
-                    result = result[0]
-            elif object.get_type == "all":
-                result = cursor.fetchall()
-                # TODO: simplify single row lists
-                if self._simplify(object, result):
-                    pass
-            self._results[object.serial] = result
+        object._done.wait()
+        if object._error is not None:
+            raise object._error
+        return object._result
+
+    def _execute(self, object, commit=True, connection=None):
+        if connection is None:
+            connection = self.connection
 
-        cursor.close()
+        query, inputs = object._build()
 
-        if isinstance(object, WriteObjects):
-            self.connection.commit()
+        # connections run in autocommit; writes open an explicit
+        # transaction so the batch-commit logic owns the boundaries
+        if object._is_write and not connection.in_transaction:
+            connection.execute("BEGIN IMMEDIATE")
 
-        if object.await_completion or (object.await_completion is None and self.await_completion):
-            self._awaited.append(object.serial)
+        try:
+            if object._executemany:
+                cursor = connection.executemany(query, object.rows)
+            else:
+                cursor = connection.execute(query, inputs)
+        except (sqlite3.OperationalError, sqlite3.IntegrityError) as exception:
+            # on the unbatched path a failed write must not leave its
+            # BEGIN IMMEDIATE dangling and holding the write lock
+            if commit and not self._in_transaction and connection.in_transaction:
+                connection.rollback()
+            # raw inputs; QueryError formats them only when printed
+            raise QueryError(exception.args[0], query, inputs) from exception
+
+        object._result = object._fetch(cursor)
+
+        if commit and not self._in_transaction and object._is_write:
+            connection.commit()
 
     def _executions(self):
-        while self.alive:
-            if self._toRead:
-                object = self._toRead[0]
-                self._execute(object)
-                index = self._toRead.index(object)
-                self._toRead.pop(index)
-            elif self._toWrite:
-                object = self._toWrite[0]
-                self._execute(object)
-                index = self._toWrite.index(object)
-                self._toWrite.pop(index)
+        pending_writes = 0
+        while not self._shutdown.is_set():
+            object = self._queue.get()
+            if object is None:
+                self._queue.task_done()
+                break
+            try:
+                self._execute(object, commit=False)
+                if object._is_write:
+                    pending_writes += 1
+            except Exception as error:
+                object._error = error
+                if not pending_writes and not self._in_transaction \
+                        and self.connection.in_transaction:
+                    self.connection.rollback()
+            # commits are batched across queued writes so a burst of
+            # writes costs one fsync instead of one per query
+            if pending_writes and (pending_writes >= 64 or self._queue.empty()) \
+                    and not self._in_transaction:
+                self.connection.commit()
+                pending_writes = 0
+            object._done.set()
+            self._queue.task_done()
 
 # TODO: pragma values
 class DatabaseObject(ExecuctionObject):
@@ -152,13 +319,17 @@ class DatabaseObject(ExecuctionObject):
          - path: The path to the database file.
          - separate_thread: Whether the database should use a separate thread for execution.
          - await_completion: Whether the database should wait for queries to complete before returning.
+         - shared_executor: Whether to run queries on a thread pool shared between databases
+           instead of a dedicated thread per database.
+         - pragmas: A dictionary of pragma overrides merged over the tuned defaults.
 
          NOTE: If separate_thread is False, await_completion will be ignored.
     """
 
     alive = False
 
-    def __init__(self, path, separate_thread=True, await_completion=True):
+    def __init__(self, path, separate_thread=True, await_completion=True,
+                 shared_executor=False, pragmas=None, cached_statements=256):
         super(DatabaseObject, self).__init__()
         if not path.endswith(".db"):
             path += ".db"
@@ -166,6 +337,13 @@ class DatabaseObject(ExecuctionObject):
         self.name = path.replace("\\", "/").split("/")[-1][:-5]
         self.separate_thread = separate_thread
         self.await_completion = await_completion
+        self.shared_executor = shared_executor
+        self.cached_statements = cached_statements
+        self.pragmas = dict(_DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self._tables_cache = None
+        self._schema_cache = dict()
         self.start()
 
     def table(self, name):
@@ -173,10 +351,9 @@ class DatabaseObject(ExecuctionObject):
                 Parameters
                 - name: The name of the table.
             """
-        table = TableObject(self, name)
-        if not table.exists:
+        if name not in self.tables:
             raise TableError("table does not exist")
-        return table
+        return TableObject(self, name)
 
     def create(self, name, columns=None, await_completion=True, must_not_exist=False, **kwargs):
         """ Creates a table within the database.
@@ -204,29 +381,85 @@ class DatabaseObject(ExecuctionObject):
     def optimise(self):
         raise NotImplemented("database optimising has not yet been implemented")
 
+    def _invalidateSchema(self):
+        self._tables_cache = None
+        self._schema_cache.clear()
+
     @property
     def tables(self):
         """ Returns a list of all tables in the database. """
-        self.waitForQueue()
-        query = f"SELECT name FROM sqlite_master WHERE type='table'"
-        tables = list()
-        for item in RawReadObject(query, database=self).run():
-            tables.append(item[0])
-        return tables
+        if self._tables_cache is None:
+            query = "SELECT name FROM sqlite_master WHERE type='table'"
+            self._tables_cache = [item[0] for item in self._metaQuery(query)]
+        return list(self._tables_cache)
 
     @property
     def queue(self):
         """ Returns the number of queries in the queue. """
-        return len(self._toRead + self._toWrite)
+        return self._queue.qsize()
+
+    def flush(self):
+        """ Waits for the queue to drain and commits any pending writes. """
+        self.waitForQueue()
+        self.connection.commit()
+
+    @contextmanager
+    def transaction(self):
+        """ Groups every write run inside the block into a single commit.
+
+            NOTE: Reads use their own connections and will not see the
+            block's writes until the transaction commits.
+        """
+        self.waitForQueue()
+        self._in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            if self.separate_thread:
+                self._queue.join()
+            self._in_transaction = False
+            self.connection.rollback()
+            raise
+        if self.separate_thread:
+            self._queue.join()
+        self._in_transaction = False
+        self.connection.commit()
+
+    def _connect(self, readonly=False):
+        path = self.path
+        if readonly:
+            # read-only connections cannot take the write lock at all,
+            # so a misrouted write fails fast instead of blocking
+            path = f"file:{path}?mode=ro"
+        connection = sqlite3.connect(path, check_same_thread=False,
+                                     cached_statements=self.cached_statements,
+                                     isolation_level=None, uri=readonly)
+        for pragma, value in self.pragmas.items():
+            if readonly and pragma == "journal_mode":
+                continue
+            connection.execute(f"PRAGMA {pragma}={value}")
+        return connection
 
     def start(self):
         """ Initiates a connection to the database. """
         if self.alive:
             raise DataError("DatabaseObject has already been started")
         self.alive = True
+        # a previous close() leaves the old event set, which would make a
+        # respawned worker exit immediately
+        self._shutdown = threading.Event()
         if self.separate_thread:
-            threading.Thread(target=self._executions, daemon=True).start()
-        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            if self.shared_executor:
+                self._readers = _sharedExecutor()
+                self._worker_lock = threading.Lock()
+                self._pending_writes = 0
+            else:
+                threading.Thread(target=self._executions, daemon=True).start()
+                self._readers = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+            self._reader_local = threading.local()
+            self._reader_connections = list()
+        self.connection = self._connect()
+        self._meta_connection = self._connect()
 
     def close(self, ignore_queue=False):
         """ Closes the connection to the database. """
@@ -235,8 +468,26 @@ class DatabaseObject(ExecuctionObject):
         if not ignore_queue:
             self.waitForQueue()
         self.alive = False
-        self._toRead = list()
-        self._toWrite = list()
+        self._shutdown.set()
+        if self.separate_thread:
+            while True:
+                try:
+                    object = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if object is not None:
+                    object._error = DatabaseError("database was closed before the query completed")
+                    object._done.set()
+                self._queue.task_done()
+            if self.shared_executor:
+                with self._worker_lock:
+                    pass
+            else:
+                self._queue.put(None)
+                self._readers.shutdown(wait=True)
+            for connection in self._reader_connections:
+                connection.close()
+        self._meta_connection.close()
         self.connection.close()
 
     def __enter__(self):
@@ -264,6 +515,8 @@ class TableObject:
 
         self.database = database
         self.name = table
+        self._quoted = _quote(table)
+        self._count_query = f"SELECT COUNT(*) AS count FROM {self._quoted}"
 
     def __enter__(self):
         return self
@@ -279,15 +532,17 @@ class TableObject:
         """
         if name in self.database.tables:
             raise TableError("table already exists")
-        query = f"ALTER TABLE {self.name} RENAME TO '{name}'"
+        query = f"ALTER TABLE {self._quoted} RENAME TO {_quote(name)}"
         RawWriteObject(query, table=self).run()
         self.name = name
+        self._quoted = _quote(name)
+        self._count_query = f"SELECT COUNT(*) AS count FROM {self._quoted}"
+
 
     def delete(self):
         """ Deletes the table. """
-        query = f"DROP TABLE {self.name}"
+        query = f"DROP TABLE {self._quoted}"
         RawWriteObject(query, table=self).run()
-        del self
 
     def addColumn(self, *values, **kwargs):
         """ Adds a column to the table.
@@ -311,10 +566,24 @@ class TableObject:
         """ Adds a row to the table.
 
             Parameters
-                - values: A dictionary of columns and the values to add.
+                - values: A dictionary of columns and the values to add,
+                  or a list of such dictionaries to add in one batch.
         """
+        if isinstance(values, (list, tuple)):
+            return self.addMany(values)
         AddRowObject(self, values, **kwargs).run()
 
+    def addMany(self, rows, columns=None):
+        """ Adds multiple rows to the table in a single query.
+
+            Parameters
+             - rows: A list of dictionaries of columns and the values to add,
+               or a list of value sequences if columns is given.
+             - columns: The column names the value sequences map onto.
+        """
+        AddRowsObject(self, rows, columns).run()
+    addRows = addMany
+
     def remove(self):
         """ Starts a query to remove a row from the table. """
         return RemoveRowObject(self)
@@ -344,39 +613,34 @@ class TableObject:
         """
         return SetObject(self, *values, **kwargs)
 
+    def _schema(self):
+        """ Returns the cached column name to type mapping. """
+        schema = self.database._schema_cache.get(self.name)
+        if schema is None:
+            query = "SELECT name, type FROM PRAGMA_TABLE_INFO(?)"
+            schema = dict(self.database._metaQuery(query, (self.name,)))
+            self.database._schema_cache[self.name] = schema
+        return schema
+
     @property
     def exists(self):
         """ Returns whether the table exists. """
-        self.database.waitForQueue()
-        query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{self.name}'"
-        return bool(RawReadObject(query, table=self).run())
+        return self.name in self.database.tables
 
     @property
     def columns(self):
         """ Returns a list of all columns in the table. """
-        self.database.waitForQueue()
-        query = f"SELECT name FROM PRAGMA_TABLE_INFO('{self.name}')"
-        columns = list()
-        for item in RawReadObject(query, table=self).run():
-            columns.append(item[0])
-        return columns
+        return list(self._schema())
 
     @property
     def columns_types(self):
         """ Returns a list of all columns and their types in the table. """
-        self.database.waitForQueue()
-        query = f"SELECT name, type FROM PRAGMA_TABLE_INFO('{self.name}')"
-        columns = dict()
-        for item in RawReadObject(query, table=self).run():
-            columns[item[0]] = item[1]
-        return columns
+        return dict(self._schema())
 
     @property
     def rows(self):
         """ Returns the number of rows in the table. """
-        self.database.waitForQueue()
-        query = f"SELECT COUNT(*) AS count FROM {self.name}"
-        return RawReadObject(query, table=self).run()[0][0]
+        return self.database._metaQuery(self._count_query)[0][0]
 
     def __repr__(self):
         columns = len(self.columns)
@@ -384,10 +648,17 @@ class TableObject:
 
 class QueryObject:
 
+    # class-level markers so hot-path dispatch is an attribute lookup
+    # instead of an isinstance scan over the module-bottom tuples
+    _is_query = True
+    _is_write = False
+    _is_logic = False
+    _executemany = False
+
     def __init__(self):
         super(QueryObject, self).__init__()
-        if not isinstance(self, QueryObjects):
-            raise InstanceError("instance is not a valid QueryObject")
+        self.inputs = list()
+        self._built = None
 
     def run(self, await_completion=None):
         if not self.database.alive:
@@ -398,17 +669,25 @@ class QueryObject:
     async def asyncRun(self):
         return self.run(await_completion=True)
 
+    def _fetch(self, cursor):
+        """ Collects the query's result from the cursor, if it has one. """
+        return None
+
+    def _build(self):
+        """ Builds the query text and its inputs once, caching the result. """
+        if self._built is None:
+            self.inputs = list()
+            self._built = (self._buildQuery(), tuple(self.inputs))
+        return self._built
+
     @property
     def query(self):
-        if not isinstance(self, QueryObjects):
-            raise InstanceError("instance is not a valid QueryObject")
-        self.inputs = list()
-        if hasattr(self, "serial"):
-            return self._query
-        query = self._query
-        for input in self.inputs:
-            query = query.replace("?", input, 1)
-        return query
+        query, inputs = self._build()
+        if not inputs:
+            return query
+        parts = query.split("?")
+        query = "".join(part + str(input) for part, input in zip(parts, inputs))
+        return query + parts[-1]
 
     def __repr__(self):
         return f"<{self.type} query object>"
@@ -417,162 +696,125 @@ class LogicObject:
 
     def __init__(self, object, item, conjunctive=None):
         super(LogicObject, self).__init__()
-        if not isinstance(object, LogicObjects):
+        if not getattr(object, "_is_logic", False):
             raise InstanceError("instance is not a valid LogicObject")
 
         self.object = object
         self.item = item
         self.conjunctive = conjunctive
 
-    def eq(self, value):
-        """ Checks if the value is equal to the specified value. """
-        self.operation = "="
+    def _operation(self, operation, value):
+        validate = _OP_VALIDATORS.get(operation)
+        if validate is not None:
+            validate(value)
+        self.operation = operation
         self.value = value
         return self._filter
+
+    def eq(self, value):
+        """ Checks if the value is equal to the specified value. """
+        return self._operation("=", value)
     equalto = equal = eq
 
     def neq(self, value):
         """ Checks if the value is not equal to the specified value. """
-        self.operation = "!="
-        self.value = value
-        return self._filter
-    notequalto = notequal = eq
+        return self._operation("!=", value)
+    notequalto = notequal = neq
 
     def gt(self, value):
         """ Checks if the value is greater than the specified value. """
-        self._isNumber(value)
-        self.operation = ">"
-        self.value = value
-        return self._filter
+        return self._operation(">", value)
     greaterthan = gt
 
     def lt(self, value):
         """ Checks if the value is less than the specified value. """
-        self._isNumber(value)
-        self.operation = "<"
-        self.value = value
-        return self._filter
+        return self._operation("<", value)
     lessthan = lt
 
     def gteq(self, value):
         """ Checks if the value is greater than or equal to the specified value. """
-        self._isNumber(value)
-        self.operation = ">="
-        self.value = value
-        return self._filter
+        return self._operation(">=", value)
     greaterthanorequalto = gteq
 
     def lteq(self, value):
         """ Checks if the value is less than or equal to the specified value. """
-        self._isNumber(value)
-        self.operation = "<="
-        self.value = value
-        return self._filter
+        return self._operation("<=", value)
     lessthanorequalto = lteq
 
     def like(self, value):
         """ Checks if the value is similar to the specified value. """
-        self._isString(value)
-        self.operation = "LIKE"
-        self.value = value
-        return self._filter
+        return self._operation("LIKE", value)
 
     def nlike(self, value):
         """ Checks if the value is not similar to the specified value. """
-        self._isString(value)
-        self.operation = "NOT LIKE"
-        self.value = value
-        return self._filter
+        return self._operation("NOT LIKE", value)
     notlike = nlike
 
     def contains(self, value):
         """ Checks if the value contains the specified value. """
-        self._isString(value)
-        self.operation = "LIKE"
-        self.value =  "%" + value + "%"
-        return self._filter
+        _is_string(value)
+        return self._operation("LIKE", "%" + value + "%")
 
     def ncontains(self, value):
         """ Checks if the value does not contain the specified value. """
-        self._isString(value)
-        self.operation = "NOT LIKE"
-        self.value =  "%" + value + "%"
-        return self._filter
+        _is_string(value)
+        return self._operation("NOT LIKE", "%" + value + "%")
     notcontains = ncontains
 
     def startswith(self, value):
         """ Checks if the value starts with the specified value. """
-        self._isString(value)
-        self.operation = "LIKE"
-        self.value = value + "%"
-        return self._filter
+        _is_string(value)
+        return self._operation("LIKE", value + "%")
 
     def nstartswith(self, value):
         """ Checks if the value does not start with the specified value. """
-        self._isString(value)
-        self.operation = "NOT LIKE"
-        self.value = value + "%"
-        return self._filter
+        _is_string(value)
+        return self._operation("NOT LIKE", value + "%")
     notstartswith = nstartswith
 
     def endswith(self, value):
         """ Checks if the value ends with the specified value. """
-        self._isString(value)
-        self.operation = "LIKE"
-        self.value = "%" + value
-        return self._filter
+        _is_string(value)
+        return self._operation("LIKE", "%" + value)
 
     def nendswith(self, value):
         """ Checks if the value does not end with the specified value. """
-        self._isString(value)
-        self.operation = "NOT LIKE"
-        self.value = "%" + value
-        return self._filter
+        _is_string(value)
+        return self._operation("NOT LIKE", "%" + value)
     notendswith = nendswith
 
     def IN(self, *values):
         """ Checks if the value is in the specified values. """
         if isinstance(values[0], (list, tuple, set)):
             values = values[0]
-        self.operation = "IN"
-        self.value = values
-        return self._filter
+        return self._operation("IN", values)
 
     def NOTIN(self, *values):
         """ Checks if the value is not in the specified values. """
         if isinstance(values[0], (list, tuple, set)):
             values = values[0]
-        self.operation = "NOT IN"
-        self.value = values
-        return self._filter
-
-    def _isNumber(self, value):
-        if not isinstance(value, (int, float)):
-            raise TypeError("comparison number must be an integer or float")
-
-    def _isString(self, value):
-        if not isinstance(value, (str, blob)):
-            raise TypeError("comparison item must be a string")
+        return self._operation("NOT IN", values)
 
     @property
     def _filter(self):
         self.object.filtered.append(self)
+        self.object._filter_cache = None
+        self.object._built = None
         return self.object
 
-    @property
-    def _logic(self):
-        logic = ""
+    def _logic(self, inputs):
+        parts = list()
         if self.conjunctive:
-            logic += " " + self.conjunctive
-        logic += f" {self.item} " + self.operation
-        if self.operation in ["IN", "NOTIN"]:
+            parts.append(" " + self.conjunctive)
+        parts.append(f" {self.item} " + self.operation)
+        if self.operation in ("IN", "NOT IN"):
             for value in self.value:
-                self.object.inputs.append(value)
-            logic += "(" + ", ".join("?" * len(self.value)) + ")"
+                inputs.append(value)
+            parts.append("(" + _placeholders(len(self.value)) + ")")
         else:
-            logic += " ?"
-            self.object.inputs.append(self.value)
-        return logic
+            parts.append(" ?")
+            inputs.append(self.value)
+        return "".join(parts)
 
     def __repr__(self):
         return f"<{self.object.type} logic object>"
@@ -581,10 +823,8 @@ class FilterObject:
 
     def __init__(self):
         super(FilterObject, self).__init__()
-        if not isinstance(self, QueryObject):
-            raise InstanceError("instance is not a QueryObject")
-
         self.filtered = list()
+        self._filter_cache = None
 
     def where(self, item):
         """ Filters the query based on the specified item. """
@@ -709,23 +949,23 @@ class FilterObject:
 
     @property
     def _filter(self):
-        if not self.filtered:
-            return ""
-        query = " WHERE"
-        for filter in self.filtered:
-            query += filter._logic
-        return query
+        if self._filter_cache is None:
+            inputs = list()
+            parts = [filter._logic(inputs) for filter in self.filtered]
+            sql = " WHERE" + "".join(parts) if parts else ""
+            self._filter_cache = (sql, inputs)
+        sql, inputs = self._filter_cache
+        self.inputs.extend(inputs)
+        return sql
 
 class SortObject:
 
     def __init__(self):
         super(SortObject, self).__init__()
-        if not isinstance(self, QueryObject):
-            raise InstanceError("instance is not a valid QueryObject")
-
         self.order = "DESC"
         self.sorted = list()
         self.sortlimit = None
+        self._sort_sql = None
 
     def sort(self, *items):
         """ Sorts the items by the specified items.
@@ -736,6 +976,8 @@ class SortObject:
         if isinstance(items[0], (list, tuple, set)):
             items = items[0]
         self.sorted = items
+        self._sort_sql = None
+        self._built = None
         return self
 
     def asc(self):
@@ -743,6 +985,8 @@ class SortObject:
         if not self.sorted:
             raise SortError("items must be provided to sort by before using asc")
         self.order = "ASC"
+        self._sort_sql = None
+        self._built = None
         return self
 
     def desc(self):
@@ -750,6 +994,8 @@ class SortObject:
         if not self.sorted:
             raise SortError("items must be provided to sort by before using desc")
         self.order = "DESC"
+        self._sort_sql = None
+        self._built = None
         return self
 
     def limit(self, limit):
@@ -761,17 +1007,20 @@ class SortObject:
         if not self.sorted:
             raise SortError("items must be provided to sort before providing a limit")
         self.sortlimit = limit
+        self._sort_sql = None
+        self._built = None
         return self
 
     def _sort(self):
-        if not self.sorted:
-            return ""
-        statement = " ORDER BY "
-        statement += ", ".join(self.sorted)
-        statement += " " + self.order
-        if self.sortlimit is not None:
-            statement += " LIMIT " + str(self.sortlimit)
-        return statement
+        if self._sort_sql is None:
+            if not self.sorted:
+                self._sort_sql = ""
+            else:
+                statement = " ORDER BY " + ", ".join(self.sorted) + " " + self.order
+                if self.sortlimit is not None:
+                    statement += " LIMIT " + str(self.sortlimit)
+                self._sort_sql = statement
+        return self._sort_sql
 
 class RawReadObject(QueryObject):
     """ Allows for raw read queries to be performed.
@@ -800,8 +1049,10 @@ class RawReadObject(QueryObject):
     def _run(self):
         return self.database._read(self)
 
-    @property
-    def _query(self):
+    def _fetch(self, cursor):
+        return cursor.fetchall()
+
+    def _buildQuery(self):
         return self.rawquery
 
 class RawWriteObject(QueryObject):
@@ -814,6 +1065,7 @@ class RawWriteObject(QueryObject):
     """
 
     type = "raw write"
+    _is_write = True
 
     def __init__(self, rawquery, table=None, database=None):
         super(RawWriteObject, self).__init__()
@@ -831,13 +1083,13 @@ class RawWriteObject(QueryObject):
     def _run(self):
         return self.database._write(self)
 
-    @property
-    def _query(self):
+    def _buildQuery(self):
         return self.rawquery
 
 class CreateTableObject(QueryObject):
 
     type = "create table"
+    _is_write = True
 
     def __init__(self, database, table, columns, **kwargs):
         super(CreateTableObject, self).__init__()
@@ -851,38 +1103,13 @@ class CreateTableObject(QueryObject):
             columns = kwargs
 
         items = dict()
-        for item in columns:
-            value = columns[item]
-            if isinstance(value, primary):
-                if value.autoincrement and value.type is not int:
-                    raise TypeError("primary keys with autoincrementation must be integers")
-                elif value.type not in [str, blob, int, float]:
-                    raise TypeError(f"'{value.type}' is an invalid data type")
-                items[item] = value
-            elif isinstance(value, foreign):
-                if type(value.table) is str:
-                    if value.table not in database.tables:
-                        raise InstanceError(f"table '{value.table}' does not exist")
-                    value.table = database.table(value.table)
-                elif not isinstance(value.table, TableObject):
-                    raise InstanceError("table for foreign key is not a table name or a TableObject")
-                elif value.type not in [str, blob, int, float]:
-                    raise TypeError(f"'{value.type}' is an invalid data type")
-                if value.column is None:
-                    value.column = item
-                elif type(value.column) is not str:
-                    raise TypeError("column for foreign key is not a string or None")
-                if value.column not in value.table.columns:
-                    raise InstanceError(f"column '{value.column}' does not exist")
-                value.type = value.table.columns_types[value.column]
-                items[item] = value
-            elif isinstance(value, (unique, default, null, notnull)):
-                if value.type not in [str, blob, int, float]:
-                    raise TypeError(f"'{value.type}' is an invalid data type")
-                items[item] = value
+        for item, value in columns.items():
+            validate = _COLUMN_VALIDATORS.get(type(value))
+            if validate is not None:
+                items[item] = validate(value, item, database)
             elif value is primary:
                 items[item] = primary()
-            elif value in [str, blob, int, float]:
+            elif isinstance(value, type) and value in _SCALAR_TYPES:
                 items[item] = null(value)
             else:
                 raise TypeError(f"'{value}' is an invalid data type")
@@ -895,43 +1122,13 @@ class CreateTableObject(QueryObject):
         self.database._write(self)
         return TableObject(self.database, self.name)
 
-    @property
-    def _query(self):
-        query = f"CREATE TABLE IF NOT EXISTS {self.name} ("
-        lines = list()
-        autoincrement = False
-        primaries = list()
-        for item in self.items:
-            line = item + " "
-            value = self.items[item]
-            if value.type is str:
-                line += "TEXT"
-            elif value.type is int:
-                line += "INTEGER"
-            elif value.type is float:
-                line += "REAL"
-            elif value.type is blob:
-                line += "BLOB"
-            if isinstance(value, primary):
-                if value.autoincrement:
-                    autoincrement = True
-                    line += " NOT NULL PRIMARY KEY AUTOINCREMENT"
-                else:
-                    line += " NOT NULL"
-                primaries.append(item)
-            elif isinstance(value, foreign):
-                line += " NOT NULL REFERENCES " + value.table.name + "(" + value.column + ")"
-            elif isinstance(value, default):
-                line += " DEFAULT "
-                if value.type in [str, blob]:
-                    line += "'" + value.value + "'"
-                elif value.type in [int, float]:
-                    line += str(value.value)
-            elif isinstance(value, unique):
-                line += " NOT NULL UNIQUE"
-            elif isinstance(value, notnull):
-                line += " NOT NULL"
-            lines.append(line)
+    def _buildQuery(self):
+        lines = [_format_column(item, value)
+                 for item, value in self.items.items()]
+        primaries = [item for item, value in self.items.items()
+                     if isinstance(value, primary)]
+        autoincrement = any(self.items[item].autoincrement
+                            for item in primaries)
         if autoincrement and len(primaries) > 1:
             raise TypeError(
                 "cannot autoincrement primary key with two or more primary keys."
@@ -939,11 +1136,12 @@ class CreateTableObject(QueryObject):
             )
         elif not autoincrement and len(primaries) > 0:
             lines.append("PRIMARY KEY (" + ", ".join(primaries) + ")")
-        return query + ", ".join(lines) + ")"
+        return f"CREATE TABLE IF NOT EXISTS {self.name} (" + ", ".join(lines) + ")"
 
 class AddColumnObject(QueryObject):
 
     type = "add column"
+    _is_write = True
 
     def __init__(self, table, values, refit=False, **kwargs):
         super(AddColumnObject, self).__init__()
@@ -956,22 +1154,22 @@ class AddColumnObject(QueryObject):
         if kwargs:
             values = kwargs
 
-        name = list(values.keys())[0]
+        name = next(iter(values))
         value = values[name]
         if isinstance(value, primary):
             if value.autoincrement and value.type is not int:
                 raise TypeError("primary keys with autoincrementation must be integers")
-            elif value.type not in [str, blob, int, float]:
+            elif value.type not in _SCALAR_TYPES:
                 raise TypeError(f"'{value.type}' is an invalid data type")
         elif isinstance(value, (unique, default, null, notnull)):
-            if value.type not in [str, blob, int, float]:
+            if value.type not in _SCALAR_TYPES:
                 raise TypeError(f"'{value.type}' is an invalid data type")
-        elif value in [primary, str, blob, int, float]:
+        elif isinstance(value, type) and value in _PRIMARY_OR_SCALAR:
             value = null(value)
         else:
             raise TypeError(f"'{value}' is an invalid data type")
 
-        if name in table.columns:
+        if name in table._schema():
             raise TableError("column already exists")
 
         self.database = table.database
@@ -981,39 +1179,27 @@ class AddColumnObject(QueryObject):
         self.value = value
 
     def andAdd(self, **kwargs):
-        for item in kwargs:
-            self.items[item] = kwargs[item]
+        self.items.update(kwargs)
         return self
 
     def _run(self):
         return self.database._write(self)
 
-    @property
-    def _query(self):
+    def _buildQuery(self):
         if not self.refit:
             query = f"ALTER TABLE {self.table.name} "
             query += f"ADD COLUMN {self.name} "
             value = self.value
-            if value.type is str:
-                query += "TEXT"
-            elif value.type is int:
-                query += "INTEGER"
-            elif value.type is float:
-                query += "REAL"
-            elif value.type is blob:
-                query += "BLOB"
-            elif value.type is primary:
+            if value.type is primary:
                 query += "INTEGER PRIMARY KEY"
+            else:
+                query += _SQL_TYPE.get(value.type, "")
             if isinstance(value, primary):
                 if value.autoincrement:
                     raise TypeError("cannot add an autoincrement value to a new column")
-                query += " PRIMARY KEY"
+                query += _PRIMARY_KEY
             elif isinstance(value, default):
-                query += " DEFAULT "
-                if value.type in [str, blob]:
-                    query += "'" + value.value + "'"
-                elif value.type in [int, float]:
-                    query += str(value.value)
+                query += _DEFAULT + _default_literal(value)
             elif isinstance(value, unique):
                 raise TypeError("cannot add a unique value to a new column")
             elif isinstance(value, notnull):
@@ -1023,6 +1209,7 @@ class AddColumnObject(QueryObject):
 class AddRowObject(QueryObject):
 
     type = "add row"
+    _is_write = True
 
     def __init__(self, table, values, **kwargs):
         super(AddRowObject, self).__init__()
@@ -1037,27 +1224,83 @@ class AddRowObject(QueryObject):
 
         self.database = table.database
         self.table = table
-        self.items = values.copy()
+        # held by reference; andAdd copies before mutating
+        self.items = values
 
     # essentially useless
     def andAdd(self, **kwargs):
-        for item in kwargs:
-            self.items[item] = kwargs[item]
+        self.items = {**self.items, **kwargs}
+        self._built = None
         return self
 
     def _run(self):
         return self.database._write(self)
 
-    @property
-    def _query(self):
-        query = f"INSERT INTO {self.table.name} ({', '.join(self.items)}) "
-        query += f"VALUES ({', '.join('?' * len(self.items))})"
+    def _buildQuery(self):
+        key = ("insert", self.table.name, tuple(self.items))
+        query = _QUERY_TEMPLATE_CACHE.get(key)
+        if query is None:
+            query = (f"INSERT INTO {self.table.name} ({', '.join(self.items)}) "
+                     f"VALUES ({_placeholders(len(self.items))})")
+            _QUERY_TEMPLATE_CACHE[key] = query
         self.inputs = list(self.items.values())
         return query
 
+class AddRowsObject(QueryObject):
+
+    type = "add rows"
+    _is_write = True
+    _executemany = True
+
+    def __init__(self, table, rows, columns=None):
+        super(AddRowsObject, self).__init__()
+        if not isinstance(table, TableObject):
+            raise InstanceError("instance is not a TableObject")
+
+        if not rows:
+            raise InputError("you must provide rows to be added")
+
+        if columns is not None:
+            columns = tuple(columns)
+
+        if isinstance(rows[0], dict):
+            if columns is None:
+                columns = tuple(rows[0])
+            for row in rows:
+                if tuple(row) != columns:
+                    raise InputError("all rows must share the same columns")
+            getter = itemgetter(*columns)
+            if len(columns) == 1:
+                rows = [(getter(row),) for row in rows]
+            else:
+                rows = [getter(row) for row in rows]
+        elif columns is None:
+            raise InputError("you must provide columns when adding rows as sequences")
+        else:
+            rows = [tuple(row) for row in rows]
+
+        self.database = table.database
+        self.table = table
+        self.columns = columns
+        self.rows = rows
+
+    def _run(self):
+        return self.database._write(self)
+
+    def _buildQuery(self):
+        key = ("insert", self.table.name, self.columns)
+        query = _QUERY_TEMPLATE_CACHE.get(key)
+        if query is None:
+            query = (f"INSERT INTO {self.table.name} ({', '.join(self.columns)}) "
+                     f"VALUES ({_placeholders(len(self.columns))})")
+            _QUERY_TEMPLATE_CACHE[key] = query
+        return query
+
 class RemoveRowObject(QueryObject, FilterObject):
 
     type = "remove row"
+    _is_write = True
+    _is_logic = True
 
     def __init__(self, table):
         super(RemoveRowObject, self).__init__()
@@ -1070,14 +1313,16 @@ class RemoveRowObject(QueryObject, FilterObject):
     def _run(self):
         return self.database._write(self)
 
-    @property
-    def _query(self):
+    def _buildQuery(self):
         query = f"DELETE FROM {self.table.name}"
-        return query + self._filter
+        if self.filtered:
+            query += self._filter
+        return query
 
 class GetObject(QueryObject, FilterObject, SortObject):
 
     type = "get row"
+    _is_logic = True
 
     def __init__(self, table, get_type, *items):
         super(GetObject, self).__init__()
@@ -1095,27 +1340,50 @@ class GetObject(QueryObject, FilterObject, SortObject):
         self.database = table.database
         self.table = table
         self.get_type = get_type
-        self.items = items
+        self.items = list(items)
+        self._simplifiable = len(items) == 1 and items[0] != "*"
 
     def andGet(self, *items):
         if "*" in self.items:
             return self
         if isinstance(items[0], (list, tuple, set)):
             items = items[0]
-        self.items += items
+        self.items.extend(items)
+        self._simplifiable = False
+        self._built = None
         return self
 
     def _run(self):
         return self.database._read(self)
 
-    @property
-    def _query(self):
-        query = f"SELECT {', '.join(self.items)} FROM {self.table.name}"
-        return query + self._filter + self._sort()
+    def _fetch(self, cursor):
+        if self.get_type == "first":
+            result = cursor.fetchone()
+            if self._simplifiable and result is not None:
+                result = result[0]
+            return result
+        result = cursor.fetchall()
+        if self._simplifiable:
+            return list(map(itemgetter(0), result))
+        return result
+
+    def _buildQuery(self):
+        key = ("select", self.table.name, tuple(self.items))
+        query = _QUERY_TEMPLATE_CACHE.get(key)
+        if query is None:
+            query = f"SELECT {', '.join(self.items)} FROM {self.table.name}"
+            _QUERY_TEMPLATE_CACHE[key] = query
+        if self.filtered:
+            query += self._filter
+        if self.sorted:
+            query += self._sort()
+        return query
 
 class SetObject(QueryObject, FilterObject, SortObject):
 
     type = "set row"
+    _is_write = True
+    _is_logic = True
 
     def __init__(self, table, values=None, **kwargs):
         super(SetObject, self).__init__()
@@ -1128,49 +1396,57 @@ class SetObject(QueryObject, FilterObject, SortObject):
         if kwargs:
             values = kwargs
 
-        items = dict()
-        for item in values:
-            items[item] = values[item]
-
         self.database = table.database
         self.table = table
-        self.items = items
+        self.items = dict(values)
+        self._set_cache = None
 
     def andSet(self, **kwargs):
-        for item in kwargs:
-            self.items[item] = kwargs[item]
+        self.items.update(kwargs)
+        self._set_cache = None
+        self._built = None
         return self
 
     def _run(self):
         return self.database._write(self)
 
-    @property
-    def _query(self):
-        query = f"UPDATE {self.table.name} SET "
-        items = list()
-        for item in self.items:
-            value = self.items[item]
-            if isinstance(value, (str, blob, int, float)):
-                if isinstance(value, blob):
-                    value = value.value
-                items.append(f"{item}=?")
-                self.inputs.append(value)
-            elif isinstance(value, increment):
-                items.append(f"{item}={item}+?")
-                self.inputs.append(value.increment)
-            elif isinstance(value, concatenate):
-                items.append(f"{item}={item} || ?")
-                self.inputs.append(value.concatenate)
-            elif value is null or isinstance(value, null):
-                items.append(f"{item}=NULL")
-            else:
-                raise TypeError(f"'{type(value)}' is an invalid data type")
-        return query + ", ".join(items) + self._filter + self._sort()
+    def _setFragment(self, item, value, inputs):
+        emit = _SET_EMITTERS.get(type(value))
+        if emit is not None:
+            fragment, value = emit(item, value)
+            inputs.append(value)
+            return fragment
+        if value is null or isinstance(value, null):
+            return f"{item}=NULL"
+        if isinstance(value, (str, blob, int, float)):
+            # subclasses (e.g. bool) miss the exact-type table
+            if isinstance(value, blob):
+                value = value.value
+            inputs.append(value)
+            return f"{item}=?"
+        raise TypeError(f"'{type(value)}' is an invalid data type")
+
+    def _buildQuery(self):
+        # the SET clause only depends on items, so reruns with a new
+        # filter skip the per-column dispatch
+        if self._set_cache is None:
+            inputs = list()
+            fragment = ", ".join(self._setFragment(item, value, inputs)
+                                 for item, value in self.items.items())
+            self._set_cache = (fragment, inputs)
+        fragment, inputs = self._set_cache
+        self.inputs.extend(inputs)
+        query = f"UPDATE {self.table.name} SET " + fragment
+        if self.filtered:
+            query += self._filter
+        if self.sorted:
+            query += self._sort()
+        return query
 
 QueryObjects = (RawReadObject, RawWriteObject,
                 CreateTableObject, AddColumnObject,
-                AddRowObject, RemoveRowObject,
+                AddRowObject, AddRowsObject, RemoveRowObject,
                 GetObject, SetObject)
 LogicObjects = (RemoveRowObject, GetObject, SetObject)
 WriteObjects = (RawWriteObject, CreateTableObject, AddColumnObject,
-                AddRowObject, RemoveRowObject, SetObject)
\ No newline at end of file
+                AddRowObject, AddRowsObject, RemoveRowObject, SetObject)
\ No newline at end of file
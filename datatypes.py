@@ -1,19 +1,27 @@
 class blob:
+    __slots__ = ("value",)
     def __init__(self, value):
-        self.value = str(value)
+        if not isinstance(value, (str, bytes)):
+            value = str(value)
+        self.value = value
     def __repr__(self):
-        return self.value
+        if isinstance(self.value, str):
+            return self.value
+        return str(self.value)
 
 class increment:
+    __slots__ = ("increment",)
     def __init__(self, increment=1):
         self.increment = increment
 
 class concatenate:
+    __slots__ = ("concatenate",)
     def __init__(self, concatenate=""):
         self.concatenate = concatenate
 concat = concatenate
 
 class primary:
+    __slots__ = ("type", "autoincrement")
     def __init__(self, type=int, autoincrement=False):
         if autoincrement and type is not int:
             autoincrement = False
@@ -22,24 +30,30 @@ class primary:
 primary_key = primary
 
 class foreign:
+    # "type" is assigned by the create-table validator
+    __slots__ = ("type", "table", "column")
     def __init__(self, table, column=None):
         self.table = table
         self.column = column
 foreign_key = foreign
 
 class unique:
+    __slots__ = ("type",)
     def __init__(self, type):
         self.type = type
 
 class default:
+    __slots__ = ("type", "value")
     def __init__(self, value):
         self.type = type(value)
         self.value = value
 
 class null:
+    __slots__ = ("type",)
     def __init__(self, type):
         self.type = type
 
 class notnull:
+    __slots__ = ("type",)
     def __init__(self, type):
         self.type = type
\ No newline at end of file
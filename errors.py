@@ -27,9 +27,13 @@ class QueryError(DatabaseError):
         self.query = query
         self.inputs = inputs
 
+    def _format(self, input):
+        if isinstance(input, str):
+            return "'" + input + "'"
+        return str(input)
+
     def __str__(self):
-        message = self.error_message
-        message += "\nON QUERY: " + self.query
+        parts = [self.error_message, "ON QUERY: " + self.query]
         if self.inputs:
-            message += "\nWITH VALUES: " + ", ".join(self.inputs)
-        return message
\ No newline at end of file
+            parts.append("WITH VALUES: " + ", ".join(map(self._format, self.inputs)))
+        return "\n".join(parts)
\ No newline at end of file